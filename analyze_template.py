@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Analyze Template
+Runs the Word control analysis and the template tag check over one read of the template.
+"""
+
+import sys
+
+from analyze_word_controls import analyze_word_controls_from_parts
+from check_template import analyze_docx_template_from_parts
+from docx_parts import iter_parts
+
+def analyze_all(path, fuzzy=False, quiet=False):
+    """Run both analyzers on the template, decompressing its XML parts only once.
+    
+    Returns the sorted control names and whether the template tags are clean.
+    """
+    try:
+        parts = tuple(iter_parts(path))
+    except Exception as e:
+        print(f"❌ Error opening {path}: {e}")
+        return [], None
+    
+    controls = analyze_word_controls_from_parts(parts, path, fuzzy=fuzzy, quiet=quiet)
+    print()
+    clean = analyze_docx_template_from_parts(parts, path, quiet=quiet)
+    return controls, clean
+
+if __name__ == "__main__":
+    template_file = "standaardofferte Compufit NL.docx"
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    
+    if args:
+        template_file = args[0]
+    
+    analyze_all(template_file, fuzzy='--fuzzy' in sys.argv[1:], quiet='--quiet' in sys.argv[1:])
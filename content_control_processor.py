@@ -4,20 +4,381 @@ Content Control Processor
 Properly processes Word content controls (Structured Document Tags) using XML manipulation.
 """
 
+import concurrent.futures
+import copy
+import functools
+import hashlib
 import zipfile
-import xml.etree.ElementTree as ET
-import tempfile
+from lxml import etree
 import shutil
 import os
 import json
+import re
 from datetime import datetime
 
+# Parts of the package that can hold content controls
+_CONTROL_PARTS = (
+    'word/document.xml',
+    'word/header1.xml',
+    'word/header2.xml',
+    'word/header3.xml',
+    'word/footer1.xml',
+    'word/footer2.xml',
+    'word/footer3.xml',
+)
+
+# Control mappings shipped next to this module, independent of the working directory
+_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'control_mappings.json')
+
+# Parser for the parts; huge_tree lifts libxml2's limits on very large text
+# nodes and deep nesting, which big generated documents can exceed
+_PARSER = etree.XMLParser(huge_tree=True, remove_blank_text=False)
+
+# Leading XML declaration of a part, with the whitespace after it
+_XML_DECLARATION_RE = re.compile(rb'<\?xml[^?]*\?>\s*')
+
+# Deflate level for rewritten parts; level 1 takes half the time of the
+# default for a few percent larger XML
+_REWRITE_COMPRESSLEVEL = 1
+
+# Prefix of the archive comment that records which inputs produced an output
+_RENDER_KEY_PREFIX = b'cgmoffers-render:'
+
+_W_URI = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_NS = {'w': _W_URI}
+
+# Qualified names of the elements written into content controls
+_W = '{' + _W_URI + '}'
+_W_P = _W + 'p'
+_W_R = _W + 'r'
+_W_T = _W + 't'
+_W_BR = _W + 'br'
+_W_RPR = _W + 'rPr'
+_W_RSTYLE = _W + 'rStyle'
+_W_VAL = _W + 'val'
+_W_W = _W + 'w'
+_W_BODY = _W + 'body'
+_W_SECT_PR = _W + 'sectPr'
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Compiled lookups for the content controls of a part
+_NAMED_SDT_XPATH = etree.XPath('.//w:sdt[w:sdtPr/w:alias or w:sdtPr/w:tag]', namespaces=_NS)
+_ALIAS_XPATH = etree.XPath('string(w:sdtPr[1]/w:alias[1]/@w:val)', namespaces=_NS, smart_strings=False)
+_TAG_XPATH = etree.XPath('string(w:sdtPr[1]/w:tag[1]/@w:val)', namespaces=_NS, smart_strings=False)
+_CONTENT_XPATH = etree.XPath('w:sdtContent[1]', namespaces=_NS)
+
+# Style definitions in word/styles.xml
+_STYLE_XPATH = etree.XPath('w:style', namespaces=_NS)
+_STYLE_NAME_XPATH = etree.XPath('string(w:name/@w:val)', namespaces=_NS, smart_strings=False)
+
+def _set_single_run_text(runs, text):
+    """Overwrite the text of a lone run holding just run properties and one w:t.
+    
+    Returns False, leaving the runs untouched, for any other shape of content.
+    """
+    if len(runs) != 1 or any(ch.tag not in (_W_RPR, _W_T) for ch in runs[0]):
+        return False
+    
+    texts = runs[0].findall(_W_T)
+    if len(texts) != 1:
+        return False
+    
+    texts[0].text = text
+    texts[0].set(_XML_SPACE, 'preserve')
+    
+    # The value is real content now, so drop the grey placeholder character style
+    rpr = runs[0].find(_W_RPR)
+    if rpr is not None:
+        for rstyle in rpr.findall(_W_RSTYLE):
+            if rstyle.get(_W_VAL) == 'PlaceholderText':
+                rpr.remove(rstyle)
+    
+    return True
+
+def _write_lines(sdt_content, lines):
+    """Replace the text of a content control with the given lines."""
+    
+    # Detect SDT level by inspecting existing children BEFORE modifying
+    existing_children = list(sdt_content)
+    has_run_child = any(ch.tag == _W_R for ch in existing_children)
+    has_para_child = any(ch.tag == _W_P for ch in existing_children)
+    
+    if has_run_child and not has_para_child:
+        # RUN-LEVEL SDT: rewrite the direct runs under sdtContent
+        container = sdt_content
+    else:
+        # BLOCK-LEVEL SDT (paragraph/table cell): update within a paragraph
+        # Use first paragraph if present; otherwise create one
+        container = sdt_content.find(_W_P)
+        if container is None:
+            # Do NOT wipe all content; just create new paragraph appended
+            container = etree.SubElement(sdt_content, _W_P)
+    
+    runs = container.findall(_W_R)
+    
+    # A single-line value going into a control that holds one text run
+    # is written in place, keeping the run formatting from the template
+    if len(lines) == 1 and _set_single_run_text(runs, lines[0]):
+        return
+    
+    # Replace the existing runs, adding explicit line breaks
+    if runs:
+        container[:] = [ch for ch in container if ch.tag != _W_R]
+    
+    for i, part in enumerate(lines):
+        r = etree.SubElement(container, _W_R)
+        t = etree.SubElement(r, _W_T)
+        t.set(_XML_SPACE, 'preserve')
+        t.text = part
+        if i < len(lines) - 1:
+            br_run = etree.SubElement(container, _W_R)
+            etree.SubElement(br_run, _W_BR)
+
+@functools.lru_cache(maxsize=4)
+def _load_config(config_path, mtime):
+    """Parse the control mappings file; the result is shared by all processors."""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+def _first_item(data, section):
+    """First cost item of a section, or an empty item when there is none."""
+    items = data.get(section, [])
+    return items[0] if items else {}
+
+def _first_amount(amounts, default):
+    """First of a list of formatted amounts, or the default for an empty section."""
+    return amounts[0] if amounts else default
+
+# Values of 'field' controls that are not a plain lookup of the field in the
+# data, as functions of (processor, data, calculations)
+_FIELD_VALUES = {
+    # Table fields that pull from the first cost item
+    'modulenname': lambda self, data, calc: _first_item(data, 'oneTimeCosts').get('material', ''),
+    'itemammount': lambda self, data, calc: str(_first_item(data, 'oneTimeCosts').get('quantity', '')),
+    'annualmaterialcost': lambda self, data, calc: _first_amount(calc['recurring_unit_prices'], ''),
+}
+
+# Values of 'calculated' controls by formula
+_CALCULATED_VALUES = {
+    'current_date': lambda self, data, calc: calc['current_date'],
+    'sum_one_time_costs': lambda self, data, calc: f"{calc['one_time_total']:.2f}",
+    'sum_recurring_costs': lambda self, data, calc: f"{calc['recurring_total']:.2f}",
+    'recurringandonetimewithoutVAT': lambda self, data, calc: f"{calc['total_excl_vat']:.2f}",
+    'VAT': lambda self, data, calc: f"{calc['vat_amount']:.2f}",
+    'grandtotal': lambda self, data, calc: f"{calc['grand_total']:.2f}",
+    # Table-specific calculated fields, for the first cost item
+    'ammounttimespriceonetimematerial': lambda self, data, calc: _first_amount(calc['one_time_line_totals'], '€0.00'),
+    'ammounttimespricerecurringmaterial': lambda self, data, calc: _first_amount(calc['recurring_line_totals'], '€0.00'),
+}
+
+# Calculated fields that use 'value' instead of 'formula'
+_CALCULATED_VALUES_BY_VALUE = {
+    'totalsetup': lambda self, data, calc: _first_amount(calc['one_time_unit_prices'], '€0.00'),
+}
+
+def _no_value(self, data, calc):
+    """Value of controls that are not mapped to anything."""
+    return ''
+
+def _control_resolver(config):
+    """Pick the function that computes the value of one configured control."""
+    control_type = config.get('type')
+    value = config.get('value')
+    
+    if control_type == 'field':
+        # Direct field mapping unless it is one of the special table fields
+        return _FIELD_VALUES.get(value) or (lambda self, data, calc: data.get(value, ''))
+    
+    if control_type == 'calculated':
+        return (_CALCULATED_VALUES.get(config.get('formula'))
+                or _CALCULATED_VALUES_BY_VALUE.get(value)
+                or _no_value)
+    
+    if control_type == 'list':
+        # List processing for items1 and items2
+        if value in ('oneTimeCosts', 'recurringCosts'):
+            return lambda self, data, calc: self.format_items_list(data.get(value, []))
+        return _no_value
+    
+    if control_type == 'input':
+        # Input fields like description
+        if value == 'description':
+            return lambda self, data, calc: data.get('description', '')
+        return _no_value
+    
+    # Unknown or unhandled type
+    return _no_value
+
+@functools.lru_cache(maxsize=4)
+def _control_resolvers(config_path, mtime):
+    """(control name, value function) pairs for the controls of a mappings file.
+    
+    The configuration only changes with the file, so which branch applies to
+    each control is decided once instead of for every document.
+    """
+    return tuple((control_name, _control_resolver(config))
+                 for control_name, config in _load_config(config_path, mtime)['controls'].items())
+
+def _cost_columns(items):
+    """Split cost items into per-field columns, with the per-item line totals."""
+    quantity = [item.get('quantity', 0) for item in items]
+    unit_price = [item.get('unitPrice', 0) for item in items]
+    
+    return {
+        'material': [item.get('material', '') for item in items],
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'total': [item.get('total', 0) for item in items],
+        'line_total': [q * p for q, p in zip(quantity, unit_price)],
+    }
+
+def _cost_rows(items, price_header, total_label):
+    """Header, item and total rows of a cost summary table."""
+    columns = _cost_columns(items)
+    
+    rows = [['Module', 'Aantal', price_header, 'Totaal']]
+    section_total = 0
+    for material, quantity, unit_price, total in zip(
+            columns['material'], columns['quantity'], columns['unit_price'], columns['total']):
+        section_total += total
+        rows.append([str(material), str(quantity), f"€{unit_price:.2f}", f"€{total:.2f}"])
+    
+    rows.append([total_label, '', '', f"€{section_total:.2f}"])
+    return rows
+
+def _style_ids(styles_xml):
+    """Map the lower-cased names of the styles used by the cost summary to their ids.
+    
+    Style ids depend on the language Word saved the template in, e.g. the
+    Table Grid style may be stored as 'TableGrid0'; the English built-in ids
+    are used for styles the template does not define.
+    """
+    style_ids = {'heading 1': 'Heading1', 'heading 2': 'Heading2', 'table grid': 'TableGrid'}
+    
+    if styles_xml:
+        for style in _STYLE_XPATH(etree.fromstring(styles_xml, _PARSER)):
+            name = _STYLE_NAME_XPATH(style).lower()
+            if name in style_ids:
+                style_ids[name] = style.get(_W + 'styleId')
+    
+    return style_ids
+
+@functools.lru_cache(maxsize=8)
+def _load_template(template_path, mtime):
+    """Read what gets processed out of a template, once per version of the file.
+    
+    Returns the cost summary style ids (see _style_ids) and the content
+    control parts present in the archive as a {name: xml_bytes} dict. Both
+    are shared by every render, so they must not be modified.
+    """
+    with zipfile.ZipFile(template_path, 'r') as template:
+        names = set(template.namelist())
+        styles_xml = template.read('word/styles.xml') if 'word/styles.xml' in names else None
+        parts = {name: template.read(name) for name in _CONTROL_PARTS if name in names}
+    
+    return _style_ids(styles_xml), parts
+
+@functools.lru_cache(maxsize=2 * len(_CONTROL_PARTS))
+def _part_plan(xml_content):
+    """Parse a part once and record where its named content controls are.
+    
+    Returns the parsed tree, which must not be modified, and a dict mapping
+    each control name to the child index paths from the root to its SDTs,
+    in document order. The parts of a cached template are the same bytes
+    objects on every render, so their hash is computed only once.
+    """
+    root = etree.fromstring(xml_content, _PARSER)
+    
+    control_paths = {}
+    for sdt in _NAMED_SDT_XPATH(root):
+        # The control name is the alias, or the tag when there is no alias
+        control_name = _ALIAS_XPATH(sdt) or _TAG_XPATH(sdt)
+        if control_name:
+            path = []
+            node = sdt
+            for parent in sdt.iterancestors():
+                path.append(parent.index(node))
+                node = parent
+            control_paths.setdefault(control_name, []).append(tuple(reversed(path)))
+    
+    return root.getroottree(), control_paths
+
+def _element_at(root, path):
+    """Follow a path of child indices from the root element."""
+    node = root
+    for i in path:
+        node = node[i]
+    return node
+
+def _text_width(sect_pr):
+    """Width between the page margins in twips, as python-docx computes it."""
+    page_size = sect_pr.find(_W + 'pgSz') if sect_pr is not None else None
+    margins = sect_pr.find(_W + 'pgMar') if sect_pr is not None else None
+    if page_size is None or margins is None:
+        # A4 with Word's default 1 inch margins
+        return 11906 - 2 * 1440
+    
+    return int(page_size.get(_W_W)) - int(margins.get(_W + 'left', 0)) - int(margins.get(_W + 'right', 0))
+
+def _paragraph(text=None, style_id=None, center=False, page_break=False):
+    """Build a w:p with an optional style, centring, text run or page break."""
+    p = etree.Element(_W_P, nsmap=_NS)
+    
+    if style_id or center:
+        ppr = etree.SubElement(p, _W + 'pPr')
+        if style_id:
+            etree.SubElement(ppr, _W + 'pStyle').set(_W_VAL, style_id)
+        if center:
+            etree.SubElement(ppr, _W + 'jc').set(_W_VAL, 'center')
+    
+    if page_break:
+        etree.SubElement(etree.SubElement(p, _W_R), _W_BR).set(_W + 'type', 'page')
+    elif text is not None:
+        r = etree.SubElement(p, _W_R)
+        if text:
+            etree.SubElement(r, _W_T).text = text
+    
+    return p
+
+def _table(rows, style_id, col_width):
+    """Build a w:tbl with fixed-width columns holding one paragraph of text per cell."""
+    tbl = etree.Element(_W + 'tbl', nsmap=_NS)
+    
+    tbl_pr = etree.SubElement(tbl, _W + 'tblPr')
+    etree.SubElement(tbl_pr, _W + 'tblStyle').set(_W_VAL, style_id)
+    tbl_w = etree.SubElement(tbl_pr, _W + 'tblW')
+    tbl_w.set(_W + 'type', 'auto')
+    tbl_w.set(_W_W, '0')
+    tbl_look = etree.SubElement(tbl_pr, _W + 'tblLook')
+    for attr, val in (('firstColumn', '1'), ('firstRow', '1'), ('lastColumn', '0'),
+                      ('lastRow', '0'), ('noHBand', '0'), ('noVBand', '1'), ('val', '04A0')):
+        tbl_look.set(_W + attr, val)
+    
+    grid = etree.SubElement(tbl, _W + 'tblGrid')
+    for _ in rows[0]:
+        etree.SubElement(grid, _W + 'gridCol').set(_W_W, str(col_width))
+    
+    for row in rows:
+        tr = etree.SubElement(tbl, _W + 'tr')
+        for text in row:
+            tc = etree.SubElement(tr, _W + 'tc')
+            tc_w = etree.SubElement(etree.SubElement(tc, _W + 'tcPr'), _W + 'tcW')
+            tc_w.set(_W + 'type', 'dxa')
+            tc_w.set(_W_W, str(col_width))
+            tc.append(_paragraph(text))
+    
+    return tbl
+
 class ContentControlProcessor:
-    def __init__(self):
-        # Load control mappings from JSON file
-        with open('control_mappings.json', 'r') as f:
-            self.config = json.load(f)
+    def __init__(self, verbose=False):
+        # Report every updated control and part, not just the totals
+        self.verbose = verbose
+        
+        # Load control mappings from JSON file, parsed once per version of the file
+        config_path = _CONFIG_PATH
+        self.config = _load_config(config_path, os.path.getmtime(config_path))
         self.controls = self.config['controls']
+        self.resolvers = _control_resolvers(config_path, os.path.getmtime(config_path))
     
     def process_word_template(self, template_path, data, output_path):
         """Process Word template by directly manipulating content controls in XML."""
@@ -29,290 +390,241 @@ class ContentControlProcessor:
         
         # Build control mappings
         control_mappings = self.build_control_mappings(data, calculations)
+        contextual_values = self.build_contextual_values(data, calculations)
         
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_docx = os.path.join(temp_dir, 'processing.docx')
-                shutil.copy2(template_path, temp_docx)
-                
-                replacements_made = 0
+            # Skip the work when the output was already rendered from the same inputs
+            render_key = self.render_key(template_path, data, control_mappings)
+            if self.read_render_key(output_path) == render_key:
+                print(f"♻️  {output_path} is up to date, skipping")
+                return True
+            
+            # The template parts are read once per version of the template
+            style_ids, parts = _load_template(os.path.abspath(template_path), os.path.getmtime(template_path))
+            
+            replacements_made = 0
+            
+            # The detailed cost summary is appended to the main document body
+            has_costs = bool(data.get('oneTimeCosts') or data.get('recurringCosts'))
+            
+            def process_part(filename, data_content):
+                summary_styles = style_ids if has_costs and filename == 'word/document.xml' else None
+                modified_xml, changes = self.process_content_controls_xml(
+                    data_content, control_mappings, data, contextual_values, summary_styles=summary_styles)
+                return modified_xml, changes, changes > 0 or summary_styles is not None
+            
+            workers = min(len(_CONTROL_PARTS), os.cpu_count() or 1)
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                # Process the XML files that might contain content controls in
+                # parallel while the rest of the archive is copied
+                pending = {filename: pool.submit(process_part, filename, data_content)
+                           for filename, data_content in parts.items()}
                 
-                with zipfile.ZipFile(temp_docx, 'r') as input_zip:
-                    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as output_zip:
-                        
-                        for item in input_zip.infolist():
-                            data_content = input_zip.read(item.filename)
+                with zipfile.ZipFile(template_path, 'r') as input_zip, \
+                        zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as output_zip:
+                    
+                    for item in input_zip.infolist():
+                        if item.filename in pending:
+                            data_content = parts[item.filename]
                             
-                            # Process XML files that might contain content controls
-                            if item.filename in ['word/document.xml', 'word/header1.xml', 'word/header2.xml', 
-                                               'word/header3.xml', 'word/footer1.xml', 'word/footer2.xml', 'word/footer3.xml']:
-                                try:
-                                    xml_content = data_content.decode('utf-8')
-                                    
-                                    # Process content controls in this XML
-                                    modified_xml, changes = self.process_content_controls_xml(xml_content, control_mappings, data)
-                                    
-                                    if changes > 0:
+                            try:
+                                # Process content controls in this XML
+                                modified_xml, changes, rewritten = pending[item.filename].result()
+                                
+                                if changes > 0:
+                                    if self.verbose:
                                         print(f"   📄 {item.filename}: {changes} controls updated")
-                                        replacements_made += changes
-                                        output_zip.writestr(item, modified_xml.encode('utf-8'))
-                                    else:
-                                        output_zip.writestr(item, data_content)
-                                    
-                                except Exception as e:
-                                    print(f"   ⚠️  Error processing {item.filename}: {e}")
+                                    replacements_made += changes
+                                
+                                if rewritten:
+                                    output_zip.writestr(item, modified_xml, compresslevel=_REWRITE_COMPRESSLEVEL)
+                                else:
                                     output_zip.writestr(item, data_content)
-                            else:
-                                # Copy other files unchanged
+                                
+                            except Exception as e:
+                                print(f"   ⚠️  Error processing {item.filename}: {e}")
                                 output_zip.writestr(item, data_content)
-                
-                print(f"📊 Total content controls updated: {replacements_made}")
-                
-                # Add detailed cost summary using python-docx
-                self.add_cost_summary_to_docx(output_path, data)
-                
-                return True
-                
+                        else:
+                            # Copy other files unchanged, streaming them so large media
+                            # parts are never held in memory as a whole
+                            with input_zip.open(item) as src, output_zip.open(item, 'w') as dst:
+                                shutil.copyfileobj(src, dst, 1 << 20)
+                    
+                    # Record the inputs in the archive comment, which Word ignores
+                    output_zip.comment = render_key
+            
+            print(f"📊 Total content controls updated: {replacements_made}")
+            
+            return True
+            
         except Exception as e:
             print(f"❌ Error processing content controls: {e}")
             return False
     
-    def process_content_controls_xml(self, xml_content, control_mappings, data):
-        """Process content controls in XML content with context-aware table field handling."""
+    def render_many(self, template_path, jobs, max_workers=None):
+        """Render several quotations from one template in parallel processes.
+        
+        ``jobs`` is an iterable of (data, output_path) pairs. Each worker
+        loads the template once; returns the success of each render, in order.
+        """
+        
+        renders = [(template_path, data, output_path, self.verbose) for data, output_path in jobs]
+        
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_render_worker, initargs=(template_path,)) as pool:
+            return list(pool.map(_render_job, renders))
+    
+    def render_key(self, template_path, data, control_mappings):
+        """Hash the template version and the values rendered into it."""
+        
+        inputs = json.dumps([os.path.abspath(template_path), os.path.getmtime(template_path),
+                             data, control_mappings], sort_keys=True, default=str)
+        return _RENDER_KEY_PREFIX + hashlib.blake2b(inputs.encode('utf-8'), digest_size=16).hexdigest().encode('ascii')
+    
+    def read_render_key(self, docx_path):
+        """Return the render key recorded in an existing output, or None."""
+        
+        try:
+            with zipfile.ZipFile(docx_path, 'r') as docx:
+                comment = docx.comment
+        except (OSError, zipfile.BadZipFile):
+            return None
+        
+        return comment if comment.startswith(_RENDER_KEY_PREFIX) else None
+    
+    def process_content_controls_xml(self, xml_content, control_mappings, data, contextual_values=None,
+                                     summary_styles=None):
+        """Process content controls in XML content with context-aware table field handling.
+        
+        Takes and returns the part as UTF-8 bytes (a str is encoded first).
+        With ``summary_styles`` (see _style_ids) the cost summary tables are
+        appended to the document body as well.
+        """
         
         changes_made = 0
         
+        if contextual_values is None:
+            contextual_values = self.build_contextual_values(data, self.calculate_values(data))
+        
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        
         try:
-            # Parse XML with namespace handling
-            # Register all original namespaces to preserve formatting
-            ET.register_namespace('wpc', 'http://schemas.microsoft.com/office/word/2010/wordprocessingCanvas')
-            ET.register_namespace('cx', 'http://schemas.microsoft.com/office/drawing/2014/chartex')
-            ET.register_namespace('cx1', 'http://schemas.microsoft.com/office/drawing/2015/9/8/chartex')
-            ET.register_namespace('cx2', 'http://schemas.microsoft.com/office/drawing/2015/10/21/chartex')
-            ET.register_namespace('cx3', 'http://schemas.microsoft.com/office/drawing/2016/5/9/chartex')
-            ET.register_namespace('cx4', 'http://schemas.microsoft.com/office/drawing/2016/5/10/chartex')
-            ET.register_namespace('cx5', 'http://schemas.microsoft.com/office/drawing/2016/5/11/chartex')
-            ET.register_namespace('cx6', 'http://schemas.microsoft.com/office/drawing/2016/5/12/chartex')
-            ET.register_namespace('cx7', 'http://schemas.microsoft.com/office/drawing/2016/5/13/chartex')
-            ET.register_namespace('cx8', 'http://schemas.microsoft.com/office/drawing/2016/5/14/chartex')
-            ET.register_namespace('mc', 'http://schemas.openxmlformats.org/markup-compatibility/2006')
-            ET.register_namespace('aink', 'http://schemas.microsoft.com/office/drawing/2016/ink')
-            ET.register_namespace('am3d', 'http://schemas.microsoft.com/office/drawing/2017/model3d')
-            ET.register_namespace('o', 'urn:schemas-microsoft-com:office:office')
-            ET.register_namespace('oel', 'http://schemas.microsoft.com/office/2019/extlst')
-            ET.register_namespace('r', 'http://schemas.openxmlformats.org/officeDocument/2006/relationships')
-            ET.register_namespace('m', 'http://schemas.openxmlformats.org/officeDocument/2006/math')
-            ET.register_namespace('v', 'urn:schemas-microsoft-com:vml')
-            ET.register_namespace('wp14', 'http://schemas.microsoft.com/office/word/2010/wordprocessingDrawing')
-            ET.register_namespace('wp', 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing')
-            ET.register_namespace('w10', 'urn:schemas-microsoft-com:office:word')
-            ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-            ET.register_namespace('w14', 'http://schemas.microsoft.com/office/word/2010/wordml')
-            ET.register_namespace('w15', 'http://schemas.microsoft.com/office/word/2012/wordml')
-            ET.register_namespace('w16cex', 'http://schemas.microsoft.com/office/word/2018/wordml/cex')
-            ET.register_namespace('w16cid', 'http://schemas.microsoft.com/office/word/2016/wordml/cid')
-            ET.register_namespace('w16', 'http://schemas.microsoft.com/office/word/2018/wordml')
-            ET.register_namespace('w16du', 'http://schemas.microsoft.com/office/word/2023/wordml/word16du')
-            ET.register_namespace('w16sdtdh', 'http://schemas.microsoft.com/office/word/2020/wordml/sdtdatahash')
-            ET.register_namespace('w16sdtfl', 'http://schemas.microsoft.com/office/word/2024/wordml/sdtformatlock')
-            ET.register_namespace('w16se', 'http://schemas.microsoft.com/office/word/2015/wordml/symex')
-            ET.register_namespace('wpg', 'http://schemas.microsoft.com/office/word/2010/wordprocessingGroup')
-            ET.register_namespace('wpi', 'http://schemas.microsoft.com/office/word/2010/wordprocessingInk')
-            ET.register_namespace('wne', 'http://schemas.microsoft.com/office/word/2006/wordml')
-            ET.register_namespace('wps', 'http://schemas.microsoft.com/office/word/2010/wordprocessingShape')
+            # Work on a copy of the part's cached tree, finding its named
+            # controls through the paths recorded when it was first parsed
+            master, control_paths = _part_plan(xml_content)
             
-            root = ET.fromstring(xml_content)
+            # A part with nothing to fill or append is returned as it is,
+            # without copying and serializing its tree
+            if summary_styles is None and not any(
+                    name in contextual_values or name in control_mappings for name in control_paths):
+                return xml_content, 0
             
-            # Find all Structured Document Tags (content controls)
-            w_ns = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+            tree = copy.deepcopy(master)
+            root = tree.getroot()
             
-            # Track instances of duplicate control names
-            control_instances = {}
+            # Resolve every control before any is modified, as new runs and
+            # paragraphs shift the positions of the elements after them
+            controls_by_name = {
+                control_name: [_element_at(root, path) for path in paths]
+                for control_name, paths in control_paths.items()
+            }
             
-            for sdt in root.iter(f'{w_ns}sdt'):
-                try:
-                    # Find the SDT properties to get the control name
-                    sdt_pr = sdt.find(f'{w_ns}sdtPr')
-                    if sdt_pr is not None:
-                        
-                        # Try to find alias first, then tag
-                        control_name = None
-                        
-                        alias_elem = sdt_pr.find(f'{w_ns}alias')
-                        if alias_elem is not None:
-                            control_name = alias_elem.get(f'{w_ns}val')
-                        
-                        if not control_name:
-                            tag_elem = sdt_pr.find(f'{w_ns}tag')
-                            if tag_elem is not None:
-                                control_name = tag_elem.get(f'{w_ns}val')
+            for control_name, sdts in controls_by_name.items():
+                if control_name not in contextual_values and control_name not in control_mappings:
+                    continue
+                
+                for instance_num, sdt in enumerate(sdts, 1):
+                    try:
+                        # Get the replacement value (context-aware for table fields)
+                        replacement_value = self.get_contextual_value(control_name, instance_num, control_mappings, contextual_values)
                         
-                        # If we found a control name
-                        if control_name:
-                            # Track which instance this is
-                            if control_name not in control_instances:
-                                control_instances[control_name] = 0
-                            control_instances[control_name] += 1
-                            instance_num = control_instances[control_name]
-                            
-                            # Get the replacement value (context-aware for table fields)
-                            replacement_value = self.get_contextual_value(control_name, instance_num, control_mappings, data)
-                            
-                            if replacement_value is not None:
-                                # Find the content part of the SDT and update it
-                                sdt_content = sdt.find(f'{w_ns}sdtContent')
-                                if sdt_content is not None:
-                                    # Prepare lines (support multi-line values)
-                                    lines = str(replacement_value).split('\n')
-
-                                    # Detect SDT level by inspecting existing children BEFORE modifying
-                                    existing_children = list(sdt_content)
-                                    has_run_child = any(ch.tag == f'{w_ns}r' for ch in existing_children)
-                                    has_para_child = any(ch.tag == f'{w_ns}p' for ch in existing_children)
-
-                                    if has_run_child and not has_para_child:
-                                        # RUN-LEVEL SDT: rebuild direct runs under sdtContent
-                                        # Remove existing w:r children only
-                                        for ch in existing_children:
-                                            if ch.tag == f'{w_ns}r':
-                                                sdt_content.remove(ch)
-
-                                        for i, part in enumerate(lines):
-                                            r = ET.SubElement(sdt_content, f'{w_ns}r')
-                                            t = ET.SubElement(r, f'{w_ns}t')
-                                            t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
-                                            t.text = part
-                                            if i < len(lines) - 1:
-                                                br = ET.SubElement(sdt_content, f'{w_ns}r')
-                                                ET.SubElement(br, f'{w_ns}br')
-                                    else:
-                                        # BLOCK-LEVEL SDT (paragraph/table cell): update within a paragraph
-                                        # Use first paragraph if present; otherwise create one
-                                        p = sdt_content.find(f'{w_ns}p')
-                                        if p is None:
-                                            # Do NOT wipe all content; just create new paragraph appended
-                                            p = ET.SubElement(sdt_content, f'{w_ns}p')
-
-                                        # Clear existing runs within the paragraph
-                                        for r in list(p.findall(f'{w_ns}r')):
-                                            p.remove(r)
-
-                                        # Add runs with explicit line breaks
-                                        for i, part in enumerate(lines):
-                                            r = ET.SubElement(p, f'{w_ns}r')
-                                            t = ET.SubElement(r, f'{w_ns}t')
-                                            t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
-                                            t.text = part
-                                            if i < len(lines) - 1:
-                                                br_run = ET.SubElement(p, f'{w_ns}r')
-                                                ET.SubElement(br_run, f'{w_ns}br')
-
-                                    changes_made += 1
+                        if replacement_value is not None:
+                            # Find the content part of the SDT and update it
+                            contents = _CONTENT_XPATH(sdt)
+                            if contents:
+                                # Support multi-line values
+                                _write_lines(contents[0], str(replacement_value).split('\n'))
+                                
+                                changes_made += 1
+                                if self.verbose:
                                     print(f"      ✅ Updated control '{control_name}' (instance {instance_num}) -> '{replacement_value}'")
-                
-                except Exception as e:
-                    print(f"      ⚠️  Error processing SDT: {e}")
-                    continue
+                    
+                    except Exception as e:
+                        print(f"      ⚠️  Error processing SDT: {e}")
+                        continue
             
-            # Convert back to string while preserving the original XML declaration
-            modified_xml = ET.tostring(root, encoding='unicode')
+            if summary_styles is not None:
+                self.add_cost_summary_xml(root, data, summary_styles)
             
-            # Preserve the original XML declaration
-            if xml_content.startswith('<?xml'):
-                xml_declaration = xml_content.split('?>')[0] + '?>'
-                # Remove any XML declaration from the generated content
-                if modified_xml.startswith('<?xml'):
-                    modified_xml = modified_xml.split('?>', 1)[1]
-                modified_xml = xml_declaration + modified_xml
+            # Serialize, keeping the original XML declaration bytes when there is one
+            declaration = _XML_DECLARATION_RE.match(xml_content)
+            if declaration:
+                modified_xml = declaration.group(0) + etree.tostring(tree, xml_declaration=False, encoding='UTF-8')
+            else:
+                modified_xml = etree.tostring(tree, xml_declaration=True, encoding='UTF-8')
             
             return modified_xml, changes_made
             
-        except ET.ParseError as e:
+        except etree.ParseError as e:
             print(f"   ❌ XML Parse Error: {e}")
             return xml_content, 0
         except Exception as e:
             print(f"   ❌ Error: {e}")
             return xml_content, 0
     
-    def get_contextual_value(self, control_name, instance_num, control_mappings, data):
+    def build_contextual_values(self, data, calculations):
+        """Build the values of the table fields whose content depends on their position.
+        
+        Module and Aantal map each instance number to a value (the first table
+        lists one-time costs, the second recurring costs); the price columns
+        use the same value for every instance.
+        """
+        
+        one_time_costs = data.get('oneTimeCosts', [])
+        recurring_costs = data.get('recurringCosts', [])
+        
+        def join_field(items, field):
+            # Join items per section so multiple lines appear in one cell
+            return "\n".join(filter(None, (str(item.get(field, '')) for item in items)))
+        
+        def join_amounts(amounts):
+            # One formatted amount per item, or a zero amount for an empty section
+            return "\n".join(amounts) or '€0.00'
+        
+        return {
+            'Module': {1: join_field(one_time_costs, 'material'), 2: join_field(recurring_costs, 'material')},
+            'Aantal': {1: join_field(one_time_costs, 'quantity'), 2: join_field(recurring_costs, 'quantity')},
+            'éénmalige setupkost': join_amounts(calculations['one_time_unit_prices']),
+            'calctotaalsetup': join_amounts(calculations['one_time_line_totals']),
+            'Jaarlijks': join_amounts(calculations['recurring_unit_prices']),
+            'calctotaaljaarlijks': join_amounts(calculations['recurring_line_totals']),
+        }
+    
+    def get_contextual_value(self, control_name, instance_num, control_mappings, contextual_values):
         """Get contextual value for a control based on its instance number and context."""
         
         # Handle table fields that need context-aware values
-        if control_name == 'Module':
-            # Join items per section so multiple lines appear in one cell
-            if instance_num == 1:
-                names = [str(i.get('material', '')) for i in data.get('oneTimeCosts', [])]
-                return "\n".join(filter(None, names))
-            elif instance_num == 2:
-                names = [str(i.get('material', '')) for i in data.get('recurringCosts', [])]
-                return "\n".join(filter(None, names))
-            return ''
-            
-        elif control_name == 'Aantal':
-            # Join quantities per section so multiple lines appear
-            if instance_num == 1:
-                qtys = [str(i.get('quantity', '')) for i in data.get('oneTimeCosts', [])]
-                return "\n".join(filter(None, qtys))
-            elif instance_num == 2:
-                qtys = [str(i.get('quantity', '')) for i in data.get('recurringCosts', [])]
-                return "\n".join(filter(None, qtys))
-            return ''
-            
-        # Handle price and calculated fields with multiple item support  
-        elif control_name == 'éénmalige setupkost':
-            # Unit prices for one-time costs
-            one_time_costs = data.get('oneTimeCosts', [])
-            if one_time_costs:
-                items = [f"€{item.get('unitPrice', 0):.2f}" for item in one_time_costs]
-                return "\n".join(items)
-            return '€0.00'
-            
-        elif control_name == 'calctotaalsetup':
-            # Calculated totals for one-time costs
-            one_time_costs = data.get('oneTimeCosts', [])
-            if one_time_costs:
-                items = []
-                for item in one_time_costs:
-                    total = item.get('quantity', 0) * item.get('unitPrice', 0)
-                    items.append(f"€{total:.2f}")
-                return "\n".join(items)
-            return '€0.00'
-            
-        elif control_name == 'Jaarlijks':
-            # Unit prices for recurring costs  
-            recurring_costs = data.get('recurringCosts', [])
-            if recurring_costs:
-                items = [f"€{item.get('unitPrice', 0):.2f}" for item in recurring_costs]
-                return "\n".join(items)
-            return '€0.00'
-            
-        elif control_name == 'calctotaaljaarlijks':
-            # Calculated totals for recurring costs
-            recurring_costs = data.get('recurringCosts', [])
-            if recurring_costs:
-                items = []
-                for item in recurring_costs:
-                    total = item.get('quantity', 0) * item.get('unitPrice', 0)
-                    items.append(f"€{total:.2f}")
-                return "\n".join(items)
-            return '€0.00'
-        
-        # For non-contextual controls, use the standard mapping
-        elif control_name in control_mappings:
-            return control_mappings[control_name]
-            
-        # No mapping found
-        return None
+        if control_name in contextual_values:
+            value = contextual_values[control_name]
+            if isinstance(value, dict):
+                return value.get(instance_num, '')
+            return value
+        
+        # For non-contextual controls, use the standard mapping; None if there is none
+        return control_mappings.get(control_name)
     
     def calculate_values(self, data):
         """Calculate all the values needed for the controls."""
         
-        one_time_costs = data.get('oneTimeCosts', [])
-        recurring_costs = data.get('recurringCosts', [])
+        # Pull the numbers out of the cost items once
+        one_time = _cost_columns(data.get('oneTimeCosts', []))
+        recurring = _cost_columns(data.get('recurringCosts', []))
         
         # Basic totals
-        one_time_total = sum(item.get('total', 0) for item in one_time_costs)
-        recurring_total = sum(item.get('total', 0) for item in recurring_costs)
+        one_time_total = sum(one_time['total'])
+        recurring_total = sum(recurring['total'])
         
         # Total without VAT (recurring + one time)
         total_excl_vat = one_time_total + recurring_total
@@ -329,126 +641,18 @@ class ContentControlProcessor:
             'total_excl_vat': total_excl_vat,
             'vat_amount': vat_amount,
             'grand_total': grand_total,
-            'current_date': datetime.now().strftime('%d-%m-%Y')
+            'current_date': datetime.now().strftime('%d-%m-%Y'),
+            # Per-item amounts, formatted once and shared by the table fields
+            'one_time_unit_prices': [f"€{amount:.2f}" for amount in one_time['unit_price']],
+            'one_time_line_totals': [f"€{amount:.2f}" for amount in one_time['line_total']],
+            'recurring_unit_prices': [f"€{amount:.2f}" for amount in recurring['unit_price']],
+            'recurring_line_totals': [f"€{amount:.2f}" for amount in recurring['line_total']],
         }
     
     def build_control_mappings(self, data, calculations):
         """Build control mappings based on the configuration."""
         
-        mappings = {}
-        
-        for control_name, config in self.controls.items():
-            control_type = config.get('type')
-            
-            if control_type == 'field':
-                # Direct field mapping
-                field_name = config.get('value')
-                if field_name == 'companyName':
-                    mappings[control_name] = data.get('companyName', '')
-                elif field_name == 'contactName':
-                    mappings[control_name] = data.get('contactName', '')
-                elif field_name == 'address':
-                    mappings[control_name] = data.get('address', '')
-                elif field_name == 'postalCode':
-                    mappings[control_name] = data.get('postalCode', '')
-                elif field_name == 'city':
-                    mappings[control_name] = data.get('city', '')
-                elif field_name == 'companyId':
-                    mappings[control_name] = data.get('companyId', '')
-                # Handle special table fields that pull from cost items
-                elif field_name == 'modulenname':
-                    # Get module name from first one-time cost item
-                    one_time_costs = data.get('oneTimeCosts', [])
-                    if one_time_costs:
-                        mappings[control_name] = one_time_costs[0].get('material', '')
-                    else:
-                        mappings[control_name] = ''
-                elif field_name == 'itemammount':
-                    # Get quantity from first one-time cost item  
-                    one_time_costs = data.get('oneTimeCosts', [])
-                    if one_time_costs:
-                        mappings[control_name] = str(one_time_costs[0].get('quantity', ''))
-                    else:
-                        mappings[control_name] = ''
-                elif field_name == 'annualmaterialcost':
-                    # Get unit price from first recurring cost item
-                    recurring_costs = data.get('recurringCosts', [])
-                    if recurring_costs:
-                        mappings[control_name] = f"€{recurring_costs[0].get('unitPrice', 0):.2f}"
-                    else:
-                        mappings[control_name] = ''
-                else:
-                    mappings[control_name] = data.get(field_name, '')
-                    
-            elif control_type == 'calculated':
-                # Calculated values
-                formula = config.get('formula')
-                value = config.get('value')  # Some calculated fields use 'value' instead of 'formula'
-                
-                if formula == 'current_date':
-                    mappings[control_name] = calculations['current_date']
-                elif formula == 'sum_one_time_costs':
-                    mappings[control_name] = f"{calculations['one_time_total']:.2f}"
-                elif formula == 'sum_recurring_costs':
-                    mappings[control_name] = f"{calculations['recurring_total']:.2f}"
-                elif formula == 'recurringandonetimewithoutVAT':
-                    mappings[control_name] = f"{calculations['total_excl_vat']:.2f}"
-                elif formula == 'VAT':
-                    mappings[control_name] = f"{calculations['vat_amount']:.2f}"
-                elif formula == 'grandtotal':
-                    mappings[control_name] = f"{calculations['grand_total']:.2f}"
-                # Table-specific calculated fields
-                elif formula == 'ammounttimespriceonetimematerial':
-                    # Calculate total for first one-time cost item
-                    one_time_costs = data.get('oneTimeCosts', [])
-                    if one_time_costs:
-                        item = one_time_costs[0]
-                        total = item.get('quantity', 0) * item.get('unitPrice', 0)
-                        mappings[control_name] = f"€{total:.2f}"
-                    else:
-                        mappings[control_name] = '€0.00'
-                elif formula == 'ammounttimespricerecurringmaterial':
-                    # Calculate total for first recurring cost item
-                    recurring_costs = data.get('recurringCosts', [])
-                    if recurring_costs:
-                        item = recurring_costs[0]
-                        total = item.get('quantity', 0) * item.get('unitPrice', 0)
-                        mappings[control_name] = f"€{total:.2f}"
-                    else:
-                        mappings[control_name] = '€0.00'
-                # Handle calculated fields that use 'value' instead of 'formula'
-                elif value == 'totalsetup':
-                    # Unit price for first one-time cost item
-                    one_time_costs = data.get('oneTimeCosts', [])
-                    if one_time_costs:
-                        unit_price = one_time_costs[0].get('unitPrice', 0)
-                        mappings[control_name] = f"€{unit_price:.2f}"
-                    else:
-                        mappings[control_name] = '€0.00'
-                else:
-                    mappings[control_name] = ''
-                    
-            elif control_type == 'list':
-                # List processing for items1 and items2
-                if config.get('value') == 'oneTimeCosts':
-                    mappings[control_name] = self.format_items_list(data.get('oneTimeCosts', []))
-                elif config.get('value') == 'recurringCosts':
-                    mappings[control_name] = self.format_items_list(data.get('recurringCosts', []))
-                else:
-                    mappings[control_name] = ''
-                    
-            elif control_type == 'input':
-                # Input fields like description
-                if config.get('value') == 'description':
-                    mappings[control_name] = data.get('description', '')
-                else:
-                    mappings[control_name] = ''
-                    
-            else:
-                # Unknown or unhandled type
-                mappings[control_name] = ''
-        
-        return mappings
+        return {control_name: resolve(self, data, calculations) for control_name, resolve in self.resolvers}
     
     def format_items_list(self, items):
         """Format items for list display."""
@@ -456,107 +660,72 @@ class ContentControlProcessor:
         if not items:
             return "Geen items"
         
-        formatted_lines = []
-        for item in items:
-            material = item.get('material', '')
-            quantity = item.get('quantity', 0)
-            unit_price = item.get('unitPrice', 0)
-            total = item.get('total', 0)
-            
-            line = f"• {material} - Aantal: {quantity} x €{unit_price:.2f} = €{total:.2f}"
-            formatted_lines.append(line)
-        
-        return "\n".join(formatted_lines)
+        return "\n".join([
+            f"• {item.get('material', '')} - Aantal: {item.get('quantity', 0)} x "
+            f"€{item.get('unitPrice', 0):.2f} = €{item.get('total', 0):.2f}"
+            for item in items
+        ])
     
-    def add_cost_summary_to_docx(self, docx_path, data):
-        """Add cost summary tables using python-docx."""
+    def add_cost_summary_xml(self, root, data, style_ids):
+        """Append the cost summary tables to the body of a parsed document.xml."""
         
         try:
-            from docx import Document
-            from docx.enum.text import WD_ALIGN_PARAGRAPH
-            
-            print("💰 Adding cost summary tables...")
-            
-            doc = Document(docx_path)
+            if self.verbose:
+                print("💰 Adding cost summary tables...")
             
             one_time_costs = data.get('oneTimeCosts', [])
             recurring_costs = data.get('recurringCosts', [])
             
-            if one_time_costs or recurring_costs:
-                # Add page break
-                doc.add_page_break()
-                
-                # Add header
-                header = doc.add_heading('KOSTEN SPECIFICATIE', level=1)
-                if WD_ALIGN_PARAGRAPH:
-                    header.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                
-                # Add tables (same as before)
-                if one_time_costs:
-                    doc.add_heading('Eenmalige Kosten Detail', level=2)
-                    
-                    table = doc.add_table(rows=1, cols=4)
-                    table.style = 'Table Grid'
-                    
-                    hdr_cells = table.rows[0].cells
-                    hdr_cells[0].text = 'Module'
-                    hdr_cells[1].text = 'Aantal'
-                    hdr_cells[2].text = 'Prijs per stuk'
-                    hdr_cells[3].text = 'Totaal'
-                    
-                    for item in one_time_costs:
-                        row_cells = table.add_row().cells
-                        row_cells[0].text = str(item.get('material', ''))
-                        row_cells[1].text = str(item.get('quantity', 0))
-                        row_cells[2].text = f"€{item.get('unitPrice', 0):.2f}"
-                        row_cells[3].text = f"€{item.get('total', 0):.2f}"
-                    
-                    total = sum(item.get('total', 0) for item in one_time_costs)
-                    total_row = table.add_row().cells
-                    total_row[0].text = 'TOTAAL EENMALIG'
-                    total_row[1].text = ''
-                    total_row[2].text = ''
-                    total_row[3].text = f"€{total:.2f}"
-                
-                if recurring_costs:
-                    doc.add_heading('Jaarlijkse Kosten Detail', level=2)
-                    
-                    table = doc.add_table(rows=1, cols=4)
-                    table.style = 'Table Grid'
-                    
-                    hdr_cells = table.rows[0].cells
-                    hdr_cells[0].text = 'Module'
-                    hdr_cells[1].text = 'Aantal'
-                    hdr_cells[2].text = 'Jaarlijks'
-                    hdr_cells[3].text = 'Totaal'
-                    
-                    for item in recurring_costs:
-                        row_cells = table.add_row().cells
-                        row_cells[0].text = str(item.get('material', ''))
-                        row_cells[1].text = str(item.get('quantity', 0))
-                        row_cells[2].text = f"€{item.get('unitPrice', 0):.2f}"
-                        row_cells[3].text = f"€{item.get('total', 0):.2f}"
-                    
-                    total = sum(item.get('total', 0) for item in recurring_costs)
-                    total_row = table.add_row().cells
-                    total_row[0].text = 'TOTAAL JAARLIJKS'
-                    total_row[1].text = ''
-                    total_row[2].text = ''
-                    total_row[3].text = f"€{total:.2f}"
-                
-                # Save the document
-                doc.save(docx_path)
+            if not (one_time_costs or recurring_costs):
+                return
+            
+            body = root.find(_W_BODY)
+            
+            # New content goes before the final section properties, like python-docx does
+            sect_pr = body.find(_W_SECT_PR)
+            position = body.index(sect_pr) if sect_pr is not None else len(body)
+            col_width = _text_width(sect_pr) // 4
+            
+            # Page break and header
+            summary = [
+                _paragraph(page_break=True),
+                _paragraph('KOSTEN SPECIFICATIE', style_ids['heading 1'], center=True),
+            ]
+            
+            if one_time_costs:
+                summary.append(_paragraph('Eenmalige Kosten Detail', style_ids['heading 2']))
+                summary.append(_table(_cost_rows(one_time_costs, 'Prijs per stuk', 'TOTAAL EENMALIG'),
+                                      style_ids['table grid'], col_width))
+            
+            if recurring_costs:
+                summary.append(_paragraph('Jaarlijkse Kosten Detail', style_ids['heading 2']))
+                summary.append(_table(_cost_rows(recurring_costs, 'Jaarlijks', 'TOTAAL JAARLIJKS'),
+                                      style_ids['table grid'], col_width))
+            
+            body[position:position] = summary
+            if self.verbose:
                 print("✅ Cost summary tables added")
-                
-        except ImportError:
-            print("⚠️  python-docx not available for cost summary")
+            
         except Exception as e:
             print(f"⚠️  Error adding cost summary: {e}")
 
+def _init_render_worker(template_path):
+    """Read the template into the cache of a render_many worker process."""
+    try:
+        _load_template(os.path.abspath(template_path), os.path.getmtime(template_path))
+    except (OSError, zipfile.BadZipFile):
+        # Each render reports the problem itself
+        pass
+
+def _render_job(render):
+    """Render one (template_path, data, output_path, verbose) job of render_many."""
+    template_path, data, output_path, verbose = render
+    return ContentControlProcessor(verbose=verbose).process_word_template(template_path, data, output_path)
+
 def main():
     """Test the content control processor."""
     
-    processor = ContentControlProcessor()
+    processor = ContentControlProcessor(verbose=True)
     
     test_data = {
         "companyName": "TEST PRAKTIJK BV",
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+DOCX Parts
+Shared loader for the Word XML parts inspected by the analysis scripts.
+"""
+
+import functools
+import os
+import zipfile
+
+# Parts that can hold content controls or template tags
+XML_PARTS = (
+    'word/document.xml',
+    'word/header1.xml',
+    'word/header2.xml',
+    'word/header3.xml',
+    'word/footer1.xml',
+    'word/footer2.xml',
+    'word/footer3.xml',
+)
+
+@functools.lru_cache(maxsize=8)
+def _read_parts(docx_path, mtime, names):
+    """Read the requested parts that exist in the archive, in the order given.
+
+    Missing headers/footers are filtered against the central directory up
+    front instead of letting ZipFile.read raise KeyError for each of them.
+    """
+
+    with zipfile.ZipFile(docx_path, 'r') as docx:
+        present = set(docx.namelist())
+        return tuple((name, docx.read(name)) for name in names if name in present)
+
+def iter_parts(docx_path, names=XML_PARTS):
+    """Yield (name, xml_bytes) for each of the given parts present in the document.
+
+    The archive is opened and decompressed once per (path, mtime), so several
+    analyzers run over the same template share the work.
+    """
+
+    yield from _read_parts(docx_path, os.path.getmtime(docx_path), tuple(names))